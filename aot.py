@@ -0,0 +1,20 @@
+"""
+Ahead-of-time compilation of the Numba kernels of automaton.py and sudoku.py
+into the '_kernels' extension module, so that short runs do not pay for
+JIT compilation. Build it once with 'python aot.py'; both scripts fall back
+to JIT-compiled kernels if the module is missing.
+
+Parallel loops (sudoku.solve_all) are compiled as serial ones.
+"""
+
+from numba.pycc import CC
+import automaton, sudoku
+
+cc = CC('_kernels')
+cc.export('step', 'void(u1[:],u1[:],i8,i8,u1[:],u1[:])')(automaton._step.py_func)
+cc.export('binary_step', 'void(u8[:],u8[:],i8,u8[:])')(automaton._binary_step.py_func)
+cc.export('solve', 'b1(i1[:,:])')(sudoku.solve.py_func)
+cc.export('solve_all', 'b1[:](i1[:,:,:])')(sudoku.solve_all.py_func)
+
+if __name__ == "__main__":
+    cc.compile()
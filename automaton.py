@@ -1,16 +1,83 @@
 """
 An implementation of elementary cellular automaton with adjustable neighbourhood and number of possible states.
 Inspired by https://matplotlib.org/matplotblog/posts/elementary-cellular-automata/.
+
+Requirements: Numba
 """
 
 import numpy as np, matplotlib.pyplot as plt, sys
+from numba import njit
+try:
+    import _kernels # kernels compiled ahead of time, see aot.py
+except ImportError:
+    _kernels = None
 
 # Default values for a number of states and number of neighbours
 BASE, NNEIGH = 3, 1
 
-def rule_index(multiplet: list, base: int):
-    """Computes an index assigned by a rule."""
-    return int((base**3-1)-np.sum([base**(len(multiplet)-1-i)*x for (i,x) in enumerate(multiplet)]))
+@njit(cache=True, boundscheck=False)
+def _step(prev, rule, base, nneigh, out, padded):
+    """Writes a single step of evolution of row 'prev' into 'out'.
+    'padded' is a buffer of length m+2*nneigh for the wrapped row."""
+    m = prev.shape[0]
+    const = rule.shape[0] - 1
+    padded[nneigh:nneigh+m] = prev
+    for j in range(nneigh):
+        padded[j] = prev[(j-nneigh) % m]
+        padded[nneigh+m+j] = prev[j % m]
+    for j in range(m):
+        # the rightmost neighbour is the most significant digit
+        acc = 0
+        for k in range(j+2*nneigh, j-1, -1):
+            acc = acc*base + padded[k]
+        out[j] = rule[const - acc]
+
+@njit(cache=True, boundscheck=False)
+def _binary_step(prev, rule_bits, m, out):
+    """Writes a single step of evolution of a binary automaton with one neighbour
+    on each side. Rows are packed by 64 cells into uint64 words, cell j being
+    bit j%64 of word j//64. rule_bits[v] is all ones if the rule maps
+    neighbourhood v = 4*right+2*centre+left to 1, zero otherwise."""
+    nw = prev.shape[0]
+    one, top = np.uint64(1), np.uint64(63)
+    last = np.uint64((m-1) % 64)
+    first_cell = prev[0] & one
+    last_cell = (prev[nw-1] >> last) & one
+    for k in range(nw):
+        c = prev[k]
+        # right and left neighbours of every cell of the word
+        r = (c >> one) | (prev[(k+1) % nw] << top)
+        l = (c << one) | (prev[(k-1) % nw] >> top)
+        # wrap around at the m-th cell
+        if k == nw-1:
+            r = (r & ~(one << last)) | (first_cell << last)
+        if k == 0:
+            l = (l & ~one) | last_cell
+        nr, nc, nl = ~r, ~c, ~l
+        new = ((rule_bits[0] & nr & nc & nl) | (rule_bits[1] & nr & nc & l)
+             | (rule_bits[2] & nr & c & nl) | (rule_bits[3] & nr & c & l)
+             | (rule_bits[4] & r & nc & nl) | (rule_bits[5] & r & nc & l)
+             | (rule_bits[6] & r & c & nl) | (rule_bits[7] & r & c & l))
+        if k == nw-1 and m % 64:
+            new &= (one << np.uint64(m % 64)) - one
+        out[k] = new
+
+def _binary_ca(initial_state, n_itr, rule):
+    """Evaluate evolution of a binary automaton with one neighbour on each side,
+    advancing 64 cells per word operation. Returns the same grid as cell_automaton."""
+    m = len(initial_state)
+    nw = -(-m // 64)
+    packed = np.zeros(8*nw, dtype=np.uint8)
+    packed[:(m+7)//8] = np.packbits(np.asarray(initial_state, dtype=np.uint8), bitorder='little')
+    words = np.empty((n_itr, nw), dtype=np.uint64)
+    words[0] = packed.view('<u8')
+    # bit v of the rule number is rule[7-v]
+    rule_bits = np.where(rule[::-1] == 1, ~np.uint64(0), np.uint64(0))
+    binary_step = _kernels.binary_step if _kernels else _binary_step
+    for i in range(1, n_itr):
+        binary_step(words[i-1], rule_bits, m, words[i])
+    cells = np.unpackbits(words.astype('<u8').view(np.uint8), axis=1, bitorder='little')
+    return cells[:, :m]
 
 def cell_automaton(initial_state: list, n_itr: int, rule_num: int, base=BASE,nneigh=NNEIGH):
     """Evaluate evolution of an elementary cellular automaton.
@@ -28,24 +95,32 @@ def cell_automaton(initial_state: list, n_itr: int, rule_num: int, base=BASE,nne
     CA_run: numpy.ndarray m*n_itr grid, where m is the size of the automaton, rows represent steps of evolution.
 
     """
+    # states are stored as unsigned bytes
+    if base>256:
+        raise ValueError("Number of states can not exceed 256.")
     # check if provided rule exceeds the maximum value for a given base
     if rule_num<0 or np.log(rule_num)>(base**3*np.log(base)):
         raise ValueError(f"Invalid rule for base {base}.")
     # number of all possible inputs for the evolution function
     n_pos = base**(nneigh*2+1)
     # conversion of the rule number to a given base
-    rule = np.zeros(n_pos)
+    rule = np.zeros(n_pos, dtype=np.uint8)
     str_rule = np.fromiter(np.base_repr(rule_num,base=base),dtype=int)
     rule[n_pos-len(str_rule):] = str_rule
 
+    if base == 2 and nneigh == 1:
+        return _binary_ca(initial_state, n_itr, rule)
+
     m = len(initial_state)
-    # a valiable containing all states of the automaton
-    CA_run = np.zeros((n_itr, m))
-    CA_run[0, :] = initial_state
+    # a valiable containing all states of the automaton,
+    # every row is written by the evolution so it is left uninitialised
+    CA_run = np.empty((n_itr, m), dtype=np.uint8)
+    CA_run[0, :] = np.asarray(initial_state, dtype=np.uint8)
 
+    padded = np.empty(m + 2*nneigh, dtype=np.uint8)
+    step = _kernels.step if _kernels else _step
     for i in range(1, n_itr):
-        all_multiplets = np.stack([np.roll(CA_run[i-1,:],j) for j in range(-nneigh,nneigh+1)])
-        CA_run[i, :] = rule[np.apply_along_axis(rule_index, 0, all_multiplets,base=base)]
+        step(CA_run[i-1], rule, base, nneigh, CA_run[i], padded)
     return CA_run
 
 if __name__ == "__main__":
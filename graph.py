@@ -7,58 +7,122 @@ Requirements: NetworkX 2.5
 """
 
 from json.decoder import JSONDecodeError
+from collections import deque
 import networkx as nx, sys, json
 
 class Graph:
-    def __init__(self, edges=[], count=1):
-        self.edges = edges
-        self.nodes = []
-        for e in edges:
+    def __init__(self, edges=None, count=1):
+        self.edges = {} # edge id -> [n1, n2]
+        self.adj = {}   # node -> list of (edge id, neighbour)
+        self._next_id = 0
+        self._reset_cache()
+        for e in (edges if edges is not None else []):
             if e[0]<=0 or e[1]<=0:
                 raise ValueError('Only non-negative indices are valid.')
-            if not (e[0] in self.nodes):
-                self.nodes.append(e[0])
-            if not (e[1] in self.nodes):
-                self.nodes.append(e[1])
+            self._add_edge(e)
         self.count = count
 
+    @property
+    def nodes(self):
+        """
+        Returns a view of the nodes of a graph.
+        """
+        return self.adj.keys()
+
     def __repr__(self):
-        return f"Nodes: {str(self.nodes)}\n Edges: {str(self.edges)}\n Count: {self.count}."
+        return f"Nodes: {str(list(self.nodes))}\n Edges: {str(list(self.edges.values()))}\n Count: {self.count}."
+
+    def _reset_cache(self):
+        """
+        Drops values derived from the structure of a graph.
+        Has to be called on every modification of nodes or edges.
+        """
+        self._deg_seq = None
+        self._wl_hash = None
+        self._nx = None
+
+    def _add_edge(self,e):
+        """
+        Adds edge e, creating its end nodes if necessary.
+        A loop is listed only once in the adjacency of its node.
+        """
+        eid = self._next_id
+        self._next_id += 1
+        self.edges[eid] = e
+        self._reset_cache()
+        self.adj.setdefault(e[0], []).append((eid, e[1]))
+        if e[0] != e[1]:
+            self.adj.setdefault(e[1], []).append((eid, e[0]))
+
+    def copy(self):
+        """
+        Returns an independent copy of a graph.
+        """
+        g = Graph(count=self.count)
+        g.edges = self.edges.copy()
+        g.adj = {n: a.copy() for n, a in self.adj.items()}
+        g._next_id = self._next_id
+        g._deg_seq = self._deg_seq
+        g._wl_hash = self._wl_hash
+        g._nx = self._nx
+        return g
 
     def remove_node(self,n):
         """
         Removes node n and every corresponding edge in a graph.
         """
-        self.nodes.remove(n)
-        edges = self.edges.copy()
-        for e in edges:
-            if n in e:
-                self.edges.remove(e)
+        self._reset_cache()
+        for eid, o in self.adj.pop(n):
+            del self.edges[eid]
+            if o != n:
+                self.adj[o] = [(i, x) for (i, x) in self.adj[o] if i != eid]
 
     def node_to_edge(self,n):
         """
         Removes node n and corresponding edges, adds edge 
         between neighbours of n.
         """
-        self.nodes.remove(n)
-        nei = []
-        edges = self.edges.copy()
-        for e in edges:
-            if n in e:
-                self.edges.remove(e)
-                if not (e[0] == e[1]):
-                    nei.append(e[not e.index(n)])
-        self.edges.append(nei)
+        nei = [o for (_, o) in self.adj[n] if o != n]
+        self.remove_node(n)
+        self._add_edge(nei)
 
     def list_nei(self,n):
         """
         Returns a list of neighbours of a node n.
         """
-        c = []
-        for e in self.edges:
-            if n in e:
-                c.append(e[not e.index(n)])
-        return c
+        return [o for (_, o) in self.adj[n]]
+
+    def degree_sequence(self):
+        """
+        Returns a sorted list of numbers of neighbours of every node.
+        """
+        if self._deg_seq is None:
+            self._deg_seq = sorted([len(a) for a in self.adj.values()])
+        return self._deg_seq
+
+    def wl_hash(self, rounds=3):
+        """
+        Returns a Weisfeiler-Lehman hash of a graph, taking
+        multiple edges and loops into account. Isomorphic graphs
+        always have equal hashes.
+        """
+        if self._wl_hash is None:
+            labels = {n: len(a) for n, a in self.adj.items()}
+            for _ in range(rounds):
+                labels = {n: hash((labels[n], tuple(sorted([labels[o] for (_, o) in a]))))
+                          for n, a in self.adj.items()}
+            self._wl_hash = hash(tuple(sorted(labels.values())))
+        return self._wl_hash
+
+    def as_nx(self):
+        """
+        Returns a NetworkX MultiGraph with the same nodes and edges.
+        """
+        if self._nx is None:
+            self._nx = nx.MultiGraph()
+            self._nx.add_nodes_from(self.nodes)
+            self._nx.add_edges_from(self.edges.values())
+        return self._nx
 
     def all_nei(self):
         """
@@ -75,14 +139,11 @@ def iso_check(g1:Graph, g2:Graph) -> bool:
     Relies on NetworkX's 'is_isomorphic' function.
     """
     # minimal requirements for the isomorphic relation
-    if (len(g1.nodes) == len(g2.nodes)) and (len(g1.edges)==len(g2.edges)) and (sorted([len(g1.list_nei(n)) for n in g1.nodes])==sorted([len(g2.list_nei(n)) for n in g2.nodes])): 
-            ff = nx.MultiGraph()
-            ff.add_nodes_from(g1.nodes)
-            ff.add_edges_from(g1.edges)
-            fg = nx.MultiGraph()
-            fg.add_nodes_from(g2.nodes)
-            fg.add_edges_from(g2.edges)
-            if nx.is_isomorphic(ff,fg):
+    if (len(g1.nodes) == len(g2.nodes)) and (len(g1.edges)==len(g2.edges)) and (g1.degree_sequence()==g2.degree_sequence()): 
+            # cheap invariant, rules out most of non-isomorphic pairs
+            if g1.wl_hash() != g2.wl_hash():
+                return False
+            if nx.is_isomorphic(g1.as_nx(),g2.as_nx()):
                 return True 
     return False
 
@@ -108,29 +169,34 @@ def simplify(g:Graph) -> tuple:
     """
     choices = {(1,1):4,(2,2):4,(0,0):6,(1,0):3,(2,1):2}
     m = False # True if graph was modified
-    nodes = g.nodes.copy()
-    for n in nodes:
+    # neighbours of a reduced node are checked again,
+    # as reduction may have changed their degree
+    work = deque(g.nodes)
+    while work:
+        n = work.popleft()
+        if n not in g.nodes:
+            continue
         nei = g.list_nei(n)
         c = len(nei)
         l = nei.count(n)
         if (c,l) in choices.keys():
             g.count *= choices[(c,l)]
             g.remove_node(n)
-            m = True
         elif c==3 and l==1:
+            g.count *= 2 # orientations of the loop
             g.node_to_edge(n)
-            m = True
+        else:
+            continue
+        m = True
+        work.extend(set(nei) - {n})
 
-    nodes = g.nodes.copy()
-    for n in nodes:
+    for n in g.nodes:
         nei = g.list_nei(n)
         c = len(nei)
         l = nei.count(n)
         if c == 2 and l == 0:
-            g1 = Graph(g.edges.copy(), g.count)
-            g1.nodes = nodes.copy()
-            g2 = Graph(g.edges.copy(), g.count)
-            g2.nodes = nodes.copy()
+            g1 = g.copy()
+            g2 = g.copy()
             g1.remove_node(n)
             g2.node_to_edge(n)
             return ([g1,g2], True)
@@ -145,13 +211,20 @@ def convert_irreducible(lst:list, irr:dict) -> list:
     count = 1
     if not irr:
         return lst
+    # isomorphic graphs share a WL hash, only those are compared
+    irr_by_hash = {}
+    for p in irr:
+        irr_by_hash.setdefault(p.wl_hash(), []).append(p)
+    keep = []
     for g in lst:
-        for p in irr:
+        for p in irr_by_hash.get(g.wl_hash(), []):
             if iso_check(g,p):
                 count *= p.count * g.count
-                lst.remove(g)
                 m = True
                 break
+        else:
+            keep.append(g)
+    lst[:] = keep
     if m:
         add_graph_to_list(Graph([],count=count),lst, add_iso=True)
     return lst
@@ -165,21 +238,24 @@ def main(init:list) -> list:
     by restricting simplification to higher-order graphs, graphs will be more likely to be of the same order (and potentially isomorphic).
     """
     ig = Graph(init)
-    queue = [ig]
+    queue = deque([ig])
     final = []
     k = None
     while queue:
         dimensions = [len(g.nodes) for g in queue]
         k = min(dimensions) if len(set(dimensions))>1 else None
-        for g in queue:
-            if not k or len(g.nodes)>k:
-                queue.remove(g)
-                graph_list, success = simplify(g)
-                if not success:
-                    add_graph_to_list(graph_list[0],final, True)
-                else:
-                    for gr in graph_list:
-                        add_graph_to_list(gr, queue, True)
+        # single pass over the graphs present at the start of the round
+        for _ in range(len(queue)):
+            g = queue.popleft()
+            if k and len(g.nodes)<=k:
+                queue.append(g)
+                continue
+            graph_list, success = simplify(g)
+            if not success:
+                add_graph_to_list(graph_list[0],final, True)
+            else:
+                for gr in graph_list:
+                    add_graph_to_list(gr, queue, True)
     return final
 
 if __name__ == "__main__":
@@ -200,5 +276,5 @@ if __name__ == "__main__":
     lst = convert_irreducible(main(init), irr) if convert_irr else main(init)
 
     #result in canonical form
-    final = [[g.count,g.edges] for g in lst]
+    final = [[g.count,list(g.edges.values())] for g in lst]
     print(final)
\ No newline at end of file
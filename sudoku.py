@@ -1,45 +1,78 @@
 '''
 solve Sudoku puzzles with backtracking algorithm. 
 (projecteuler.net, problem no. 96)
+
+Requirements: Numba
 '''
 
 import numpy as np, sys
+from numba import njit, prange
+try:
+    import _kernels # kernels compiled ahead of time, see aot.py
+except ImportError:
+    _kernels = None
 
-def check(a, i, val):
+@njit(cache=True)
+def _solve(a, rows, cols, boxes):
     """
-    Check if 'val' at position 'i' in 9x9 matrix 'a' satisfies sudoku rules.
+    Backtracking step on matrix 'a'. Bit 'val' of rows[r], cols[c] and boxes[b]
+    is set if 'val' is already present in row r, column c or 3x3 box b.
     """
-    i0=3*(i//3)
-    mask=np.zeros((9,9))
-    mask[i[0],:] = 1
-    mask[:,i[1]]=1
-    mask[i0[0]:i0[0]+3,i0[1]:i0[1]+3] = 1
-    return np.all(a[mask==1]!=val)
+    for r in range(9):
+        for c in range(9):
+            if a[r,c] == 0:             # first empty cell
+                b = 3*(r//3) + c//3
+                used = rows[r] | cols[c] | boxes[b]
+                for val in range(1,10): # try each value allowed by sudoku rules,
+                    bit = 1 << val      # then continue solving recursively
+                    if not used & bit:
+                        rows[r] |= bit
+                        cols[c] |= bit
+                        boxes[b] |= bit
+                        a[r,c] = val
+                        if _solve(a, rows, cols, boxes): return True
+                        rows[r] ^= bit
+                        cols[c] ^= bit
+                        boxes[b] ^= bit
+                a[r,c] = 0
+                return False
+    return True                         # if no cell is empty, puzzle is solved
 
+@njit(cache=True)
 def solve(a):
     """
     Uses backtracking to solve sudoku matrix 'a'. Returns True if solved successfully.
     """
-    if a.all(): return True     # if no cell is empty, puzzle is solved
-    i = np.argwhere(a==0)[0]
-    for val in np.arange(1,10): # try each value and check conditions,
-        if check(a,i,val):      # if satisfied, continue solving recursively
-            a[i[0],i[1]] = val
-            ok = solve(a)
-            if ok: return True
-            a[i[0],i[1]] = 0
-    return False
+    rows = np.zeros(9, np.uint16)
+    cols = np.zeros(9, np.uint16)
+    boxes = np.zeros(9, np.uint16)
+    for r in range(9):
+        for c in range(9):
+            if a[r,c]:
+                bit = 1 << a[r,c]
+                rows[r] |= bit
+                cols[c] |= bit
+                boxes[3*(r//3) + c//3] |= bit
+    return _solve(a, rows, cols, boxes)
+
+@njit(parallel=True, cache=True)
+def solve_all(all_a):
+    """
+    Solves every sudoku matrix in a N*9*9 array 'all_a' in parallel.
+    Returns boolean array, True for the puzzles solved successfully.
+    """
+    ok = np.zeros(all_a.shape[0], np.bool_)
+    for k in prange(all_a.shape[0]):
+        ok[k] = solve(all_a[k])
+    return ok
 
 if __name__ == '__main__':
 
-    with open(sys.argv[1], 'r') as f:
-        inp = f.readlines()
-    raw = [''.join(inp[i:i+9]) for i in range(1,len(inp)+1,10)]
-    res =[]
-    for item in raw:
-        a = np.array([list(map(int,i)) for i in item.strip().split('\n')],dtype=np.int64)
-        solve(a)
-        res.append(a)
+    # digits of all grids in one buffer, without 'Grid NN' headers and line breaks
+    with open(sys.argv[1], 'rb') as f:
+        digits = b''.join([l.strip() for l in f if not l.startswith(b'Grid')])
+    all_a = (np.frombuffer(digits, dtype=np.uint8) - ord('0')).reshape(-1,9,9).astype(np.int8)
+    (_kernels.solve_all if _kernels else solve_all)(all_a)
     # ProjectEuler answer format
-    res = sum([int(''.join([str(a[0,0]),str(a[0,1]),str(a[0,2])])) for a in res])
+    res = (all_a[:,0,:3].astype(np.int64) @ np.array([100,10,1])).sum()
     print(res)